@@ -0,0 +1,66 @@
+/*
+ * Fused depth map to vertex kernel for server.py, loaded with ctypes.
+ * Does the same as build_vertices_numba, rows are split between OpenMP threads.
+ *
+ * Build next to server.py with:
+ *   gcc -O3 -march=native -fopenmp -shared -fPIC -o _kinect_kernel.so _kinect_kernel.c
+ */
+#include <stdint.h>
+#include <stdlib.h>
+
+/* Raw depth value meaning "too far" */
+#define INVALID_DEPTH 2047
+
+/* First column of the row whose flat pixel index is a multiple of drop */
+static int first_column(int row, int width, int drop)
+{
+    return (drop - (int)(((int64_t)row * width) % drop)) % drop;
+}
+
+/*
+ * Writes the vertices of the kept, valid pixels into out_xyz (x, z, y per vertex)
+ * and returns how many were written, or -1 if memory ran out.
+ */
+int build_vertices(const uint16_t *depth, float *out_xyz, const float *z_lut,
+                   float sx, float sy, int height, int width, int drop)
+{
+    int64_t *row_starts = malloc(sizeof(int64_t) * (height + 1));
+    if (!row_starts)
+        return -1;
+
+    /* Pass 1: count the kept valid points of each row */
+    row_starts[0] = 0;
+    #pragma omp parallel for schedule(static)
+    for (int i = 0; i < height; i++) {
+        const uint16_t *row = depth + (int64_t)i * width;
+        int64_t count = 0;
+        for (int j = first_column(i, width, drop); j < width; j += drop)
+            count += row[j] < INVALID_DEPTH;
+        row_starts[i + 1] = count;
+    }
+
+    /* Prefix sum turns the counts into the index of each row's first output vertex */
+    for (int i = 0; i < height; i++)
+        row_starts[i + 1] += row_starts[i];
+
+    /* Pass 2: every row knows where its output starts so rows can be filled in parallel */
+    #pragma omp parallel for schedule(static)
+    for (int i = 0; i < height; i++) {
+        const uint16_t *row = depth + (int64_t)i * width;
+        float *out = out_xyz + row_starts[i] * 3;
+        float world_y = (height / 2.0f - i) * sy;
+        for (int j = first_column(i, width, drop); j < width; j += drop) {
+            uint16_t d = row[j];
+            if (d < INVALID_DEPTH) {
+                out[0] = -(j - width / 2.0f) * sx;
+                out[1] = z_lut[d];
+                out[2] = world_y;
+                out += 3;
+            }
+        }
+    }
+
+    int count = (int)row_starts[height];
+    free(row_starts);
+    return count;
+}
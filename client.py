@@ -1,10 +1,25 @@
 import os
 import socket
 import argparse
+import atexit
 import time
-import zlib
+import zstandard as zstd
 import struct
+import numpy as np
 import freenect
+from multiprocessing import shared_memory
+
+# Size prefix sent before every compressed frame, zero means the frame is in shared memory
+FRAME_HEADER = struct.Struct('!I')
+
+# Shared memory layout, must match server.py: a header whose first byte is the
+# slot holding the latest frame and whose bytes 4-7 are a frame sequence counter
+# (odd while a slot is being written), followed by two raw depth frame slots.
+SHM_NAME = "kinect_depth"
+SHM_HEADER_SIZE = 8
+SHM_SEQ = struct.Struct('=I')
+SHM_SEQ_OFFSET = 4
+FRAME_BYTES = 480 * 640 * 2
 
 
 class Kinect:
@@ -17,6 +32,40 @@ class Kinect:
             return None, None
 
 
+class SharedDepth:
+    """Double-buffered depth frames in shared memory, for a server on the same machine."""
+    def __init__(self):
+        size = SHM_HEADER_SIZE + 2 * FRAME_BYTES
+        try:
+            self.shm = shared_memory.SharedMemory(name=SHM_NAME, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a client that didn't exit cleanly
+            stale = shared_memory.SharedMemory(name=SHM_NAME)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=SHM_NAME, create=True, size=size)
+        self.slots = [
+            np.ndarray((480, 640), dtype=np.uint16, buffer=self.shm.buf, offset=SHM_HEADER_SIZE + i * FRAME_BYTES)
+            for i in range(2)
+        ]
+
+    def write(self, depth_map):
+        """Writes the frame into the slot the server isn't reading and then flips to it."""
+        buf = self.shm.buf
+        seq = SHM_SEQ.unpack_from(buf, SHM_SEQ_OFFSET)[0]
+        # Odd counter tells the server a write is in progress
+        SHM_SEQ.pack_into(buf, SHM_SEQ_OFFSET, (seq + 1) & 0xFFFFFFFF)
+        slot = 1 - buf[0]
+        self.slots[slot][:] = depth_map
+        buf[0] = slot
+        SHM_SEQ.pack_into(buf, SHM_SEQ_OFFSET, (seq + 2) & 0xFFFFFFFF)
+
+    def close(self):
+        self.slots = None
+        self.shm.close()
+        self.shm.unlink()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Client to send kinect depth map over Unix socket."
@@ -26,10 +75,24 @@ def main():
         type=str,
         help="Path of the socket to connect to",
     )
+    parser.add_argument(
+        "--shared-memory",
+        action="store_true",
+        help="Pass frames through shared memory instead of compressing them over the socket",
+    )
     args = parser.parse_args()
     socket_path = args.socket_path
 
     kinect = Kinect()
+    cctx = zstd.ZstdCompressor(level=1, threads=-1)
+    delta_map = None
+    # Reused size header, sent separately so the payload is never copied
+    header = bytearray(FRAME_HEADER.size)
+
+    shared_depth = None
+    if args.shared_memory:
+        shared_depth = SharedDepth()
+        atexit.register(shared_depth.close)
 
     while not os.path.exists(socket_path):
         print(f"Socket '{ socket_path }' does not exist. Retrying...")
@@ -38,6 +101,9 @@ def main():
     while True:
         # Connect to server Unix socket
         with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+            # Room for about one compressed frame, so a slow server blocks sendall
+            # before stale frames can queue up in the socket and add latency
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 18)
             connected = False
             while not connected:
                 try:
@@ -51,6 +117,7 @@ def main():
                     time.sleep(1)
 
             print(f"Connected to server on socket: { socket_path }")
+            last_timestamp = None
             while True:
                 depth_map, timestamp = kinect.get_depth_frame()
                 try:
@@ -58,11 +125,32 @@ def main():
                         print("Is something else using the Kinect? Only one application can access it at a time.")
                         return
 
+                    # Skip frames that were already sent
+                    if timestamp == last_timestamp:
+                        continue
+                    last_timestamp = timestamp
+
+                    if shared_depth is not None:
+                        # The socket only carries a zero size header telling the server to read the frame
+                        shared_depth.write(depth_map)
+                        FRAME_HEADER.pack_into(header, 0, 0)
+                        s.sendall(header)
+                        continue
+
+                    # Horizontal delta predictor, neighbouring depths are close so the
+                    # deltas cluster near zero and compress much better than raw values
+                    if delta_map is None:
+                        delta_map = np.empty_like(depth_map)
+                    delta_map[:, 0] = depth_map[:, 0]
+                    np.subtract(depth_map[:, 1:], depth_map[:, :-1], out=delta_map[:, 1:])
+
                     # Serialize and compress the frame
-                    data = zlib.compress(depth_map.tobytes())
+                    data = cctx.compress(memoryview(delta_map).cast('B'))
                     # print(len(data))
                     # Send the size of the compressed data first
-                    s.sendall(struct.pack('!I', len(data)) + data)
+                    FRAME_HEADER.pack_into(header, 0, len(data))
+                    s.sendall(header)
+                    s.sendall(data)
                 except BrokenPipeError:
                     print("Connection closed by server. Reconnecting...")
                     time.sleep(1)
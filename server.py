@@ -11,38 +11,107 @@ bl_info = {
 }
 
 import bpy
+import ctypes
+import mmap
 import os
 import sys
 import socket
 import struct
-import zlib
 import numpy as np
 import threading
-import queue
 import time
 from collections import deque
+
+# Add venv path so modules installed there (zstandard) can be imported
+venv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'venv', 'lib', 'python3.11', 'site-packages')
+if venv_path not in sys.path:
+    sys.path.append(venv_path)
+
+# zstandard is needed to receive frames, without it the server refuses to start
+try:
+    import zstandard as zstd
+except ImportError:
+    zstd = None
+
+# Numba is optional, without it the vertices are built with plain NumPy
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
+
+# Optional compiled kernel (see _kinect_kernel.c), used before Numba when it has been built
+try:
+    _kinect_kernel = ctypes.CDLL(os.path.join(os.path.dirname(os.path.abspath(__file__)), "_kinect_kernel.so"))
+except OSError:
+    _kinect_kernel = None
+else:
+    _kinect_kernel.build_vertices.restype = ctypes.c_int
+    _kinect_kernel.build_vertices.argtypes = (
+        ctypes.c_void_p, ctypes.c_void_p, ctypes.c_void_p,
+        ctypes.c_float, ctypes.c_float, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+    )
 # --- Addon Setup ---
 
 # Global variables to manage the server thread and data queue
 server_thread = None
 stop_event = threading.Event()
-frame_queue = queue.Queue()
+# Holds only the latest frame, appending drops the older one
+frame_queue = deque(maxlen=1)
 
 # Log management
 log_lock = threading.Lock()
 log_messages = deque(maxlen=10)
+# Incremented on every log change so the UI only rebuilds when something changed
+log_seq = 0
+# (scene pointer, log_seq) of the last sync, each scene has its own log list
+_last_synced_log = None
 
 def add_log(msg):
     """Thread-safe append a timestamped message to the log deque."""
+    global log_seq
     timestamp = time.strftime("%H:%M:%S")
     entry = f"[{timestamp}] {msg}"
     with log_lock:
         log_messages.append(entry.strip())
+        log_seq += 1
+
+# Size prefix the client sends before every compressed frame
+FRAME_HEADER = struct.Struct('!I')
+
+# Shared memory frames (client.py --shared-memory): a header whose first byte is the
+# slot holding the latest frame and whose bytes 4-7 are a frame sequence counter
+# (odd while a slot is being written), followed by two raw depth frame slots.
+# A zero size header tells that a new frame is waiting in shared memory.
+SHM_NAME = "kinect_depth"
+SHM_HEADER_SIZE = 8
+SHM_SEQ = struct.Struct('=I')
+SHM_SEQ_OFFSET = 4
+SHM_READ_RETRIES = 10
+FRAME_BYTES = 480 * 640 * 2
+
+# Timer interval used while waiting for the next frame
+FRAME_POLL_INTERVAL = 0.015
 
 # FPS globals
 frame_count = 0
 last_fps_time = time.time()
 current_fps = 0.0
+
+# Kinect depth frames are always 640x480 so the pixel grids can be built once
+_ALL_Y, _ALL_X = np.indices((480, 640), dtype=np.float32)
+
+# Per-pixel vertex (world X, 0, world Y), rebuilt only when the scale factors change
+_PIXEL_XYZ = None
+_world_scale = None
+
+# Visual Z for every possible 11-bit depth value, rebuilt only when the Z scale factor changes
+_VISUAL_Z_LUT = None
+_lut_scale = None
+
+# Output buffer for the vertex builders, large enough for every pixel of a frame.
+# The point cloud always has MAX_POINTS points and only the first ones are shown.
+MAX_POINTS = 480 * 640
+_vertex_buffer = np.empty((MAX_POINTS, 3), dtype=np.float32)
 # --- Point Cloud Logic (Main Thread) ---
 
 def create_geometry_nodes_setup(obj):
@@ -82,23 +151,45 @@ def create_geometry_nodes_setup(obj):
     for node in nodes:
         nodes.remove(node)
 
+    # Group sockets, "Point Count" tells how many of the point cloud's points are in use
+    node_group.interface.new_socket(name="Geometry", in_out='INPUT', socket_type='NodeSocketGeometry')
+    node_group.interface.new_socket(name="Point Count", in_out='INPUT', socket_type='NodeSocketInt')
+    node_group.interface.new_socket(name="Geometry", in_out='OUTPUT', socket_type='NodeSocketGeometry')
+
     # Add necessary nodes
     group_input = nodes.new(type='NodeGroupInput')
-    group_input.location = (-300, 0)
+    group_input.location = (-600, 0)
+
+    # Delete the unused points at the end of the point cloud (index >= Point Count)
+    index = nodes.new(type='GeometryNodeInputIndex')
+    index.location = (-600, -150)
+
+    compare = nodes.new(type='FunctionNodeCompare')
+    compare.location = (-450, -150)
+    compare.data_type = 'INT'
+    compare.operation = 'GREATER_EQUAL'
+
+    delete_unused = nodes.new(type='GeometryNodeDeleteGeometry')
+    delete_unused.location = (-250, 0)
+    delete_unused.domain = 'POINT'
 
     instance_on_points = nodes.new(type='GeometryNodeInstanceOnPoints')
     instance_on_points.location = (0, 0)
 
     object_info = nodes.new(type='GeometryNodeObjectInfo')
-    object_info.location = (-300, -150)
+    object_info.location = (-250, -200)
     object_info.inputs[0].default_value = instance_obj # Set the instance object
 
     group_output = nodes.new(type='NodeGroupOutput')
     group_output.location = (300, 0)
 
-    # Link the nodes
+    # Link the nodes, the integer A and B inputs of the compare node are at index 2 and 3
     links = node_group.links
-    links.new(group_input.outputs['Geometry'], instance_on_points.inputs['Points'])
+    links.new(index.outputs['Index'], compare.inputs[2])
+    links.new(group_input.outputs['Point Count'], compare.inputs[3])
+    links.new(group_input.outputs['Geometry'], delete_unused.inputs['Geometry'])
+    links.new(compare.outputs['Result'], delete_unused.inputs['Selection'])
+    links.new(delete_unused.outputs['Geometry'], instance_on_points.inputs['Points'])
     links.new(object_info.outputs['Geometry'], instance_on_points.inputs['Instance'])
     links.new(instance_on_points.outputs['Instances'], group_output.inputs['Geometry'])
 
@@ -108,84 +199,220 @@ def create_or_get_point_cloud_obj():
     obj_name = "KinectPointCloud"
 
     obj = bpy.data.objects.get(obj_name)
+    if obj and (obj.type != 'POINTCLOUD' or len(obj.data.points) != MAX_POINTS):
+        # Made by an older version as a mesh (or with the wrong size), create it again
+        old_data = obj.data
+        bpy.data.objects.remove(obj)
+        if isinstance(old_data, bpy.types.Mesh) and old_data.users == 0:
+            bpy.data.meshes.remove(old_data)
+        elif isinstance(old_data, bpy.types.PointCloud) and old_data.users == 0:
+            bpy.data.pointclouds.remove(old_data)
+        obj = None
+
     if obj:
+        modifier = obj.modifiers.get("KinectGeoNodes")
+        if not modifier or not modifier.node_group or "Point Count" not in modifier.node_group.interface.items_tree:
+            # Made by an older version without the point count input, rebuild the node setup
+            if modifier:
+                obj.modifiers.remove(modifier)
+            create_geometry_nodes_setup(obj)
         return obj
 
-    # Create new mesh and object
+    # Points can't be added to a point cloud from Python, so create a mesh with
+    # MAX_POINTS vertices and convert the object into a point cloud
     mesh = bpy.data.meshes.new(name=obj_name)
+    mesh.vertices.add(MAX_POINTS)
     obj = bpy.data.objects.new(obj_name, mesh)
     bpy.context.collection.objects.link(obj)
 
+    # The convert operator works on the view layer's active and selected objects,
+    # so make the new object the only selected one and restore the user's selection afterwards
+    view_layer = bpy.context.view_layer
+    previous_active = view_layer.objects.active
+    previous_selected = [o for o in view_layer.objects if o.select_get(view_layer=view_layer)]
+    try:
+        for o in previous_selected:
+            o.select_set(False, view_layer=view_layer)
+        obj.select_set(True, view_layer=view_layer)
+        view_layer.objects.active = obj
+        bpy.ops.object.convert(target='POINTCLOUD')
+    finally:
+        obj.select_set(False, view_layer=view_layer)
+        for o in previous_selected:
+            o.select_set(True, view_layer=view_layer)
+        view_layer.objects.active = previous_active
+
+    if obj.type != 'POINTCLOUD':
+        raise RuntimeError(f"Failed to convert '{obj_name}' into a point cloud")
+    if mesh.users == 0:
+        bpy.data.meshes.remove(mesh)
+
     # Set up the Geometry Nodes modifier for instancing
     create_geometry_nodes_setup(obj)
 
     return obj
 
+def get_pixel_vertices(scale_factor_x, scale_factor_y):
+    """
+    Returns the cached (height * width, 3) table of per-pixel vertices for the given scale factors.
+    Z is left at zero, it depends on the depth and is filled in per frame.
+    """
+    global _PIXEL_XYZ, _world_scale
+    if _world_scale != (scale_factor_x, scale_factor_y):
+        height, width = _ALL_Y.shape
+        _PIXEL_XYZ = np.zeros((height * width, 3), dtype=np.float32)
+        _PIXEL_XYZ[:, 0] = (-(_ALL_X - width / 2) * scale_factor_x).ravel()
+        # Flip vertically
+        _PIXEL_XYZ[:, 2] = ((height / 2 - _ALL_Y) * scale_factor_y).ravel()
+        _world_scale = (scale_factor_x, scale_factor_y)
+    return _PIXEL_XYZ
+
+def get_visual_z_lut(scale_factor_z):
+    """Returns the cached depth value to visual Z lookup table for the given scale factor."""
+    global _VISUAL_Z_LUT, _lut_scale
+    if _lut_scale != scale_factor_z:
+        depths = np.arange(2048, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # The physically accurate formula, converts the raw 11-bit depth value to meters
+            z_meters = 1.0 / (depths * -0.0030711016 + 3.3309495161)
+            # We apply a final scaling to the Z-axis for better visibility.
+            lut = -np.log1p(z_meters) * (scale_factor_z * 1000.0) / 2
+        # 2047 means "too far" and is always masked out
+        lut[2047] = np.nan
+        _VISUAL_Z_LUT = lut.astype(np.float32)
+        _lut_scale = scale_factor_z
+    return _VISUAL_Z_LUT
+
+def build_vertices_numpy(depth_map, scale_factor_x, scale_factor_y, scale_factor_z, point_drop_amount):
+    """Converts a depth map into an (N, 3) vertex array with NumPy."""
+    depth_flat = depth_map.ravel()
+
+    # 1. Find the flat indices of the kept, valid pixels (value 2047 means "too far").
+    # Every n-th pixel is dropped first so the mask scan only touches 1/n of the data.
+    valid_idx = np.flatnonzero(depth_flat[::point_drop_amount] < 2047)
+    if point_drop_amount > 1:
+        valid_idx *= point_drop_amount
+
+    # 2. Gather the cached world X and Y of the valid pixels straight into the vertex array,
+    # one contiguous row per vertex
+    vertices = _vertex_buffer[:len(valid_idx)]
+    np.take(get_pixel_vertices(scale_factor_x, scale_factor_y), valid_idx, axis=0, out=vertices, mode='clip')
+
+    # 3. Look up the visual Z of the valid depth values
+    vertices[:, 1] = get_visual_z_lut(scale_factor_z).take(depth_flat.take(valid_idx))
+    return vertices
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def build_vertices_numba(depth_map, scale_factor_x, scale_factor_y, visual_z_lut, point_drop_amount, out_xyz):
+        """
+        Same result as build_vertices_numpy in a single fused pass, written into out_xyz.
+        Returns the number of vertices written.
+        """
+        height, width = depth_map.shape
+
+        # Pass 1: count the kept valid points of each row in parallel.
+        # A pixel is kept when its flat index is a multiple of the drop amount.
+        row_starts = np.zeros(height + 1, dtype=np.int64)
+        for i in prange(height):
+            first_j = (point_drop_amount - (i * width) % point_drop_amount) % point_drop_amount
+            count = 0
+            for j in range(first_j, width, point_drop_amount):
+                if depth_map[i, j] < 2047:
+                    count += 1
+            row_starts[i + 1] = count
+
+        # Prefix sum turns the counts into the index of each row's first output vertex
+        for i in range(height):
+            row_starts[i + 1] += row_starts[i]
+
+        # Pass 2: every row knows where its output starts so rows can be filled in parallel
+        for i in prange(height):
+            first_j = (point_drop_amount - (i * width) % point_drop_amount) % point_drop_amount
+            k = row_starts[i]
+            for j in range(first_j, width, point_drop_amount):
+                d = depth_map[i, j]
+                if d < 2047:
+                    out_xyz[k, 0] = -(j - width / 2) * scale_factor_x
+                    out_xyz[k, 1] = visual_z_lut[d]
+                    out_xyz[k, 2] = (height / 2 - i) * scale_factor_y
+                    k += 1
+
+        return row_starts[height]
+else:
+    build_vertices_numba = None
+
+if _kinect_kernel is not None:
+    def build_vertices_c(depth_map, scale_factor_x, scale_factor_y, visual_z_lut, point_drop_amount, out_xyz):
+        """
+        Same as build_vertices_numba, but runs the compiled OpenMP kernel.
+        Returns the number of vertices written into out_xyz.
+        """
+        depth_map = np.ascontiguousarray(depth_map, dtype=np.uint16)
+        height, width = depth_map.shape
+        vertex_count = _kinect_kernel.build_vertices(depth_map.ctypes.data, out_xyz.ctypes.data,
+                                                     visual_z_lut.ctypes.data, scale_factor_x, scale_factor_y,
+                                                     height, width, point_drop_amount)
+        if vertex_count < 0:
+            raise MemoryError("Kinect kernel failed to allocate memory")
+        return vertex_count
+else:
+    build_vertices_c = None
+
 def update_point_cloud():
     """
-    Checks the queue for a new frame and updates the point cloud mesh.
+    Checks the queue for a new frame and updates the point cloud.
     This function runs in Blender's main thread via a timer.
     """
     global frame_count, last_fps_time, current_fps
     try:
         # Get a frame from the queue without blocking
-        depth_map = frame_queue.get_nowait()
-    except queue.Empty:
+        depth_map = frame_queue.popleft()
+    except IndexError:
         # Sync logs even when no new frame so UI stays up-to-date
         sync_logs_to_scene()
-        return 0.0025
-
-    obj = create_or_get_point_cloud_obj()
-    mesh = obj.data
-    point_drop_amount = getattr(bpy.context.scene, "kinect_point_drop_amount", 1)
-
-    height, width = depth_map.shape
-
-    # --- High-Performance NumPy Vertex Generation ---
-
-    # 1. Create a mask to filter out invalid depth points (value 2047 means "too far")
-    valid_mask = depth_map < 2047
+        # Kinect sends ~30 FPS, so wait about half a frame before checking again
+        return FRAME_POLL_INTERVAL
 
-    # 2. Generate X and Y grids and filter them with the mask
-    all_y, all_x = np.indices((height, width), dtype=np.float32)
-    pixel_x = all_x[valid_mask]
-    pixel_y = all_y[valid_mask]
-
-    # 3. Extract only the valid depth values
-    valid_depths = depth_map[valid_mask].astype(np.float32)
-
-    # Drop every n-th point
-    point_drop_amount = bpy.context.scene.kinect_point_drop_amount
-    if point_drop_amount > 1:
-        pixel_x = pixel_x[::point_drop_amount]
-        pixel_y = pixel_y[::point_drop_amount]
-        valid_depths = valid_depths[::point_drop_amount]
-
-    # 4. Apply the physically accurate formula to all valid points at once
-    # This converts the raw 11-bit depth value to meters.
-    z_meters = 1.0 / (valid_depths * -0.0030711016 + 3.3309495161)
+    try:
+        obj = create_or_get_point_cloud_obj()
+    except RuntimeError as e:
+        # An exception would silently unregister this timer, stop the server cleanly instead
+        add_log(f"Point cloud error: {e}")
+        add_log("Stopping server.")
+        stop_event.set()
+        sync_logs_to_scene()
+        return None
+    point_cloud = obj.data
 
-    # 5. Convert pixel coordinates to 3D space and scale for the scene
+    # Read the scene settings once per frame.
     # The scaling factor (e.g., 300.0) adjusts the overall size of the point cloud.
-    scale_factor_x = getattr(bpy.context.scene, "kinect_scale_factor_x", 0.5)
-    scale_factor_y = getattr(bpy.context.scene, "kinect_scale_factor_y", 0.5)
-    scale_factor_z = getattr(bpy.context.scene, "kinect_scale_factor_z", 0.5)
-
-    world_x = -(pixel_x - width / 2) * scale_factor_x
-
-    # Flip vertically
-    world_y = (height / 2 - pixel_y) * scale_factor_y
-    # We apply a final scaling to the Z-axis for better visibility.
-    visual_z = -np.log1p(z_meters) * (scale_factor_z  * 1000.0) / 2
-
-    # 6. Combine the X, Y, and Z coordinates into a final vertex array
-    # np.stack is a fast way to join the arrays.
-    vertices = np.stack((world_x, visual_z, world_y), axis=-1)
-
-    # Efficiently update the mesh
-    mesh.clear_geometry()
-    mesh.from_pydata(vertices, [], [])
-    mesh.update()
+    scn = bpy.context.scene
+    point_drop_amount = scn.kinect_point_drop_amount
+    scale_factor_x = scn.kinect_scale_factor_x
+    scale_factor_y = scn.kinect_scale_factor_y
+    scale_factor_z = scn.kinect_scale_factor_z
+
+    # --- High-Performance Vertex Generation ---
+    # All builders write the vertices into the start of _vertex_buffer
+    if build_vertices_c is not None:
+        vertex_count = build_vertices_c(depth_map, scale_factor_x, scale_factor_y,
+                                        get_visual_z_lut(scale_factor_z), point_drop_amount,
+                                        _vertex_buffer)
+    elif build_vertices_numba is not None:
+        vertex_count = build_vertices_numba(depth_map, scale_factor_x, scale_factor_y,
+                                            get_visual_z_lut(scale_factor_z), point_drop_amount,
+                                            _vertex_buffer)
+    else:
+        vertex_count = len(build_vertices_numpy(depth_map, scale_factor_x, scale_factor_y, scale_factor_z,
+                                                point_drop_amount))
+
+    # Efficiently update the point cloud. It always has MAX_POINTS points, the
+    # geometry nodes delete the points past the point count.
+    point_cloud.points.foreach_set("co", _vertex_buffer.ravel())
+    modifier = obj.modifiers["KinectGeoNodes"]
+    modifier[modifier.node_group.interface.items_tree["Point Count"].identifier] = int(vertex_count)
+    point_cloud.update_tag()
 
     # --- FPS update ---
     frame_count += 1
@@ -198,35 +425,86 @@ def update_point_cloud():
     # Sync logs so the UIList active index moves to latest
     sync_logs_to_scene()
 
-    # Check again for a new frame very soon
-    return 0.0025
+    # Come back right away in case another frame arrived while this one was processed
+    return 0.0
 
 
 # --- Server Logic (Background Thread) ---
 
-def recvall(conn, n):
-    """Helper function to receive n bytes from a socket."""
-    data = bytearray()
-    while len(data) < n:
-        packet = conn.recv(n - len(data))
-        if not packet:
-            return None
-        data.extend(packet)
-    return data
+def recvall_into(conn, buf, n):
+    """Helper function to receive exactly n bytes from a socket into buf."""
+    view = memoryview(buf)[:n]
+    received = 0
+    while received < n:
+        count = conn.recv_into(view[received:], n - received)
+        if not count:
+            return False
+        received += count
+    return True
+
+def decompress_into(dctx, compressed_data, buf):
+    """Helper function to decompress a zstd frame into a preallocated buffer."""
+    view = memoryview(buf)
+    received = 0
+    with dctx.stream_reader(compressed_data) as reader:
+        while received < len(view):
+            count = reader.readinto(view[received:])
+            if not count:
+                return False
+            received += count
+    return True
+
+def open_shared_depth():
+    """Maps the client's shared memory segment read-only."""
+    fd = os.open(os.path.join("/dev/shm", SHM_NAME), os.O_RDONLY)
+    try:
+        shared_depth = mmap.mmap(fd, 0, prot=mmap.PROT_READ)
+    finally:
+        os.close(fd)
+    if len(shared_depth) < SHM_HEADER_SIZE + 2 * FRAME_BYTES:
+        shared_depth.close()
+        raise ValueError(f"shared memory '{SHM_NAME}' is too small")
+    return shared_depth
+
+def read_shared_frame(shared_depth, last_seq):
+    """
+    Copies the latest frame out of shared memory.
+    Returns (depth_map, seq), depth_map is None when there is no new complete frame.
+    """
+    for _ in range(SHM_READ_RETRIES):
+        seq = SHM_SEQ.unpack_from(shared_depth, SHM_SEQ_OFFSET)[0]
+        if seq == last_seq:
+            # Already copied this frame
+            return None, last_seq
+        if seq % 2:
+            # The client is writing, give it a moment
+            time.sleep(0.001)
+            continue
+        offset = SHM_HEADER_SIZE + shared_depth[0] * FRAME_BYTES
+        depth_map = np.frombuffer(shared_depth, dtype=np.uint16, count=480 * 640,
+                                  offset=offset).reshape((480, 640)).copy()
+        # A changed counter means the client wrote during the copy and it may be torn
+        if SHM_SEQ.unpack_from(shared_depth, SHM_SEQ_OFFSET)[0] == seq:
+            return depth_map, seq
+    return None, last_seq
 
 def server_run(stop_event, frame_queue):
     """The main function for the server thread."""
-    # Add venv path inside the thread
-    venv_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'venv', 'lib', 'python3.11', 'site-packages')
-    if venv_path not in sys.path:
-        sys.path.append(venv_path)
-
     # Use an absolute path for the socket file
     socket_path = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "server.sock"))
 
     if os.path.exists(socket_path):
         os.remove(socket_path)
 
+    # Reusable decompression context, frames are length-prefixed so each one is decoded on its own
+    dctx = zstd.ZstdDecompressor()
+    # Decompressed frames are written into the same buffer every time
+    delta_buf = bytearray(480 * 640 * 2)
+    delta_map = np.frombuffer(delta_buf, dtype=np.uint16).reshape((480, 640))
+    # Receive buffers, the payload one grows if a frame doesn't fit
+    header_buf = bytearray(FRAME_HEADER.size)
+    recv_buf = bytearray(1 << 20)
+
     with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
         s.bind(socket_path)
         s.listen()
@@ -240,26 +518,47 @@ def server_run(stop_event, frame_queue):
                 with conn:
                     add_log("Client connected")
                     print("Client connected")
-                    while not stop_event.is_set():
-                        raw_data_size = recvall(conn, 4)
-                        if not raw_data_size:
-                            break
-
-                        data_size = struct.unpack('!I', raw_data_size)[0]
-                        compressed_data = recvall(conn, data_size)
-                        if not compressed_data:
-                            break
-
-                        decompressed_data = zlib.decompress(compressed_data)
-                        depth_map = np.frombuffer(decompressed_data, dtype=np.uint16).reshape((480, 640))
-
-                        # Only keep the latest frame in the queue
-                        while not frame_queue.empty():
-                            try:
-                                frame_queue.get_nowait()
-                            except queue.Empty:
+                    shared_depth = None
+                    shared_seq = None
+                    try:
+                        while not stop_event.is_set():
+                            if not recvall_into(conn, header_buf, FRAME_HEADER.size):
+                                break
+
+                            data_size = FRAME_HEADER.unpack(header_buf)[0]
+                            if data_size == 0:
+                                # The frame is waiting in shared memory, no payload follows
+                                try:
+                                    if shared_depth is None:
+                                        shared_depth = open_shared_depth()
+                                    # Copy it out, the client keeps reusing the slots
+                                    depth_map, shared_seq = read_shared_frame(shared_depth, shared_seq)
+                                except (OSError, ValueError) as e:
+                                    # Only this client is affected, keep the server running
+                                    add_log(f"Shared memory error: {e}")
+                                    break
+                                if depth_map is not None:
+                                    frame_queue.append(depth_map)
+                                continue
+
+                            if data_size > len(recv_buf):
+                                recv_buf = bytearray(data_size)
+                            if not recvall_into(conn, recv_buf, data_size):
                                 break
-                        frame_queue.put(depth_map)
+                            compressed_data = memoryview(recv_buf)[:data_size]
+
+                            if not decompress_into(dctx, compressed_data, delta_buf):
+                                break
+
+                            # Undo the client's horizontal delta predictor (uint16 wraps both ways).
+                            # This also gives the main thread its own copy of the frame.
+                            depth_map = np.cumsum(delta_map, axis=1, dtype=np.uint16)
+
+                            # Only keep the latest frame in the queue (maxlen=1 drops the older one)
+                            frame_queue.append(depth_map)
+                    finally:
+                        if shared_depth is not None:
+                            shared_depth.close()
 
             except socket.timeout:
                 continue
@@ -283,6 +582,10 @@ class WM_OT_StartKinectServer(bpy.types.Operator):
 
     def execute(self, context):
         global server_thread, stop_event
+        if zstd is None:
+            add_log("Cannot start: zstandard module not found.")
+            self.report({'ERROR'}, f"zstandard module not found, install it into: {venv_path}")
+            return {'CANCELLED'}
         if server_thread is None or not server_thread.is_alive():
             stop_event.clear()
             server_thread = threading.Thread(target=server_run, args=(stop_event, frame_queue))
@@ -339,12 +642,18 @@ class WM_OT_ClearKinectLogs(bpy.types.Operator):
 # --- UI-backed log support (main-thread) ---
 def sync_logs_to_scene():
     """Copy thread-safe deque into scene collection and set active index to last item."""
+    global _last_synced_log
     try:
         scn = bpy.context.scene
+        scene_pointer = scn.as_pointer()
     except Exception:
         return
+    # Nothing new since the last sync of this scene
+    if _last_synced_log == (scene_pointer, log_seq):
+        return
     with log_lock:
         logs = list(log_messages)
+        _last_synced_log = (scene_pointer, log_seq)
     # ensure the collection exists on the scene (registered in register())
     scn.kinect_log_items.clear()
     for msg in logs: